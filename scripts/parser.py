@@ -1,11 +1,10 @@
 import yaml, json, sys, os
 
-if len(sys.argv) != 3:
-    print('Usage: parser.py <input-yaml> <output-json>')
-    sys.exit(1)
-
-with open(sys.argv[1],'r') as f:
-    data = yaml.safe_load(f)
+# Prefer the libyaml-backed loader; fall back to pure Python if PyYAML was built without it
+try:
+    from yaml import CSafeLoader as _YLoader
+except ImportError:
+    from yaml import SafeLoader as _YLoader
 
 """
 Resolve required Confluent Cloud metadata strictly from environment variables.
@@ -21,81 +20,116 @@ required_env_vars = [
     'REST_ENDPOINT'
 ]
 
-missing_envs = [var for var in required_env_vars if not os.getenv(var)]
-if missing_envs:
-    print(f"Error: Missing required environment variables: {', '.join(missing_envs)}")
-    sys.exit(1)
-
-# Extract required Confluent Cloud variables from environment only
-tf = {
-    "organization_id": os.getenv('ORGANIZATION_ID'),
-    "environment_id": os.getenv('ENVIRONMENT_ID'),
-    "kafka_cluster_id": os.getenv('KAFKA_CLUSTER_ID'),
-    "rest_endpoint": os.getenv('REST_ENDPOINT'),
-    "topics": {},
-    "schemas": {},
-    "acls": {},
-    "service_accounts": {}
-}
-
-for t in data.get('topics', []):
-    tf['topics'][t['name']] = {
-        'partitions': t.get('partitions', 3),
-        'replication_factor': t.get('replication_factor', 3),
-        'config': t.get('config', {})
-    }
+required_sr_vars = ['SCHEMA_REGISTRY_ID', 'SCHEMA_REGISTRY_API_KEY', 'SCHEMA_REGISTRY_API_SECRET', 'SCHEMA_REGISTRY_REST_ENDPOINT']
 
-for s in data.get('schemas', []):
-    schema_file = s['schema_file']
-    if not schema_file.startswith('schemas/'):
-        print(f'Error: Schema file must be under schemas/: {schema_file}')
-        sys.exit(1)
-    if not os.path.exists(schema_file):
-        print(f'Error: Schema file not found: {schema_file}')
+
+def _emit_topics(data, tf):
+    for t in data.get('topics', []):
+        tf['topics'][t['name']] = {
+            'partitions': t.get('partitions', 3),
+            'replication_factor': t.get('replication_factor', 3),
+            'config': t.get('config', {})
+        }
+
+
+def _emit_schemas(data, tf):
+    schemas = data.get('schemas', [])
+    for s in schemas:
+        schema_file = s['schema_file']
+        if not schema_file.startswith('schemas/'):
+            print(f'Error: Schema file must be under schemas/: {schema_file}')
+            sys.exit(1)
+        if not os.path.exists(schema_file):
+            print(f'Error: Schema file not found: {schema_file}')
+            sys.exit(1)
+        subject = s['subject']
+        tf['schemas'][subject] = {
+            'subject': subject,
+            'schema_file': schema_file
+        }
+
+    # Only add schema registry attributes if schemas are present
+    if schemas:
+        missing_sr_vars = [var for var in required_sr_vars if not os.getenv(var)]
+        if missing_sr_vars:
+            print(f"Error: Missing required schema registry environment variables: {', '.join(missing_sr_vars)}")
+            sys.exit(1)
+        tf['schema_registry_id'] = os.getenv('SCHEMA_REGISTRY_ID')
+        tf['schema_registry_api_key'] = os.getenv('SCHEMA_REGISTRY_API_KEY')
+        tf['schema_registry_api_secret'] = os.getenv('SCHEMA_REGISTRY_API_SECRET')
+        tf['schema_registry_rest_endpoint'] = os.getenv('SCHEMA_REGISTRY_REST_ENDPOINT')
+
+
+def _emit_access_config(data, tf):
+    # Process access_config: creates both service_accounts and acls from unified structure
+    acl_counter = 0
+    crn_prefix = f"crn://confluent.cloud/organization={tf['organization_id']}/environment={tf['environment_id']}/cluster={tf['kafka_cluster_id']}/topic="
+    # Topics are fully built by now; freeze the names for reference checks
+    topic_names = frozenset(tf['topics'])
+    for ac in data.get('access_config', []):
+        sa_name = ac['name']
+        sa_key = sa_name.lower().replace(' ', '-')
+
+        # Create service account
+        tf['service_accounts'][sa_key] = {
+            'display_name': sa_name,
+            'description': ac.get('description', f'Service account for {sa_name}')
+        }
+
+        # Create ACL for each topic
+        for topic in ac.get('topics', []):
+            if topic not in topic_names:
+                print(f'Error: access_config entry "{sa_name}" references non-existent topic: {topic}')
+                sys.exit(1)
+
+            acl_entry = {
+                'role': ac['role'],
+                'service_account_key': sa_key,
+                'crn_pattern': crn_prefix + topic
+            }
+            tf['acls'][f'acl_{acl_counter}'] = acl_entry
+            acl_counter += 1
+
+
+def build_tf(data):
+    missing_envs = [var for var in required_env_vars if not os.getenv(var)]
+    if missing_envs:
+        print(f"Error: Missing required environment variables: {', '.join(missing_envs)}")
         sys.exit(1)
-    tf['schemas'][s['subject']] = {
-        'subject': s['subject'],
-        'schema_file': schema_file
+
+    # Extract required Confluent Cloud variables from environment only
+    tf = {
+        "organization_id": os.getenv('ORGANIZATION_ID'),
+        "environment_id": os.getenv('ENVIRONMENT_ID'),
+        "kafka_cluster_id": os.getenv('KAFKA_CLUSTER_ID'),
+        "rest_endpoint": os.getenv('REST_ENDPOINT'),
+        "topics": {},
+        "schemas": {},
+        "acls": {},
+        "service_accounts": {}
     }
 
-# Only add schema registry attributes if schemas are present
-if data.get('schemas'):
-    required_sr_vars = ['SCHEMA_REGISTRY_ID', 'SCHEMA_REGISTRY_API_KEY', 'SCHEMA_REGISTRY_API_SECRET', 'SCHEMA_REGISTRY_REST_ENDPOINT']
-    missing_sr_vars = [var for var in required_sr_vars if not os.getenv(var)]
-    if missing_sr_vars:
-        print(f"Error: Missing required schema registry environment variables: {', '.join(missing_sr_vars)}")
+    _emit_topics(data, tf)
+    _emit_schemas(data, tf)
+    _emit_access_config(data, tf)
+    return tf
+
+
+def main():
+    if len(sys.argv) != 3:
+        print('Usage: parser.py <input-yaml> <output-json>')
         sys.exit(1)
-    tf['schema_registry_id'] = os.getenv('SCHEMA_REGISTRY_ID')
-    tf['schema_registry_api_key'] = os.getenv('SCHEMA_REGISTRY_API_KEY')
-    tf['schema_registry_api_secret'] = os.getenv('SCHEMA_REGISTRY_API_SECRET')
-    tf['schema_registry_rest_endpoint'] = os.getenv('SCHEMA_REGISTRY_REST_ENDPOINT')
-
-# Process access_config: creates both service_accounts and acls from unified structure
-acl_counter = 0
-for ac in data.get('access_config', []):
-    sa_name = ac['name']
-    sa_key = sa_name.lower().replace(' ', '-')
-    
-    # Create service account
-    tf['service_accounts'][sa_key] = {
-        'display_name': sa_name,
-        'description': ac.get('description', f'Service account for {sa_name}')
-    }
-    
-    # Create ACL for each topic
-    for topic in ac.get('topics', []):
-        if topic not in tf['topics']:
-            print(f'Error: access_config entry "{sa_name}" references non-existent topic: {topic}')
-            sys.exit(1)
-        
-        acl_entry = {
-            'role': ac['role'],
-            'service_account_key': sa_key,
-            'crn_pattern': f"crn://confluent.cloud/organization={tf['organization_id']}/environment={tf['environment_id']}/cluster={tf['kafka_cluster_id']}/topic={topic}"
-        }
-        tf['acls'][f'acl_{acl_counter}'] = acl_entry
-        acl_counter += 1
 
-with open(sys.argv[2],'w') as o:
-    json.dump(tf, o, indent=2)
-print(f'Generated {sys.argv[2]}')
\ No newline at end of file
+    # Hand libyaml the whole document rather than a stream it reads back in chunks
+    with open(sys.argv[1],'r') as f:
+        data = yaml.load(f.read(), Loader=_YLoader)
+
+    tf = build_tf(data)
+
+    with open(sys.argv[2],'w') as o:
+        json.dump(tf, o, indent=2)
+    print(f'Generated {sys.argv[2]}')
+
+
+if __name__ == '__main__':
+    main()